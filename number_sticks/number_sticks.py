@@ -24,10 +24,15 @@ Sides numbered from bottom going clockwise, for example:
     7 is across the middle.
 """
 import functools
+import heapq
+import operator
 import re
+import sys
 
 # Any optimal solution shouldn't have a single move exceeding this amount.
 DEFAULT_MOVE_CUTOFF = 6
+# Any single term of the equation shouldn't need more moves than this.
+TERM_MOVE_CUTOFF = 4
 # Limit from being abused by silly users.
 MAX_VAL = 99999
 # Each number is mapped from the digit to a set of "sticks" as above.
@@ -43,15 +48,20 @@ STICK_SETS = {
     8: {1, 2, 3, 4, 5, 6, 7},
     9: {1, 3, 4, 5, 6, 7},
 }
+# The same sets packed into 7 bits, stick n is bit n - 1.
+STICK_MASKS = {digit: sum(1 << (stick - 1) for stick in sticks) for digit, sticks in STICK_SETS.items()}
 FROM_TO_CACHE = {}
+# Parses the user's query of form: x + y = z
+EXPRESSION_RE = re.compile(r'(\d+)\s*[+]\s*(\d+)\s*[=]\s*(\d+)')
 
 
-@functools.total_ordering
 class ValueMove():
     """
     A container that stores a value and a move tracker for that value.
     It is essentially a data class.
     """
+    __slots__ = ("value", "moves")
+
     def __init__(self, value, moves):
         self.value = value
         self.moves = moves
@@ -68,30 +78,16 @@ class ValueMove():
     def __sub__(self, other):
         return ValueMove(self.value - other.value, self.moves + other.moves)
 
+    # Candidates are shared through the cache, so += and -= return new objects like + and -.
     def __iadd__(self, other):
-        self.value += other.value
-        self.moves += other.moves
-
-        return self
+        return self + other
 
     def __isub__(self, other):
-        self.value -= other.value
-        self.moves += other.moves
-
-        return self
+        return self - other
 
     def __int__(self):
         return self.value
 
-    def __eq__(self, other):
-        return self.moves == other.moves
-
-    def __ne__(self, other):
-        return not self == other
-
-    def __lt__(self, other):
-        return self.moves < other.moves
-
 
 def compute_moves(from_val: int, to_val: int) -> int:
     """
@@ -103,11 +99,13 @@ def compute_moves(from_val: int, to_val: int) -> int:
 
     Returns: The total amount of moves.
     """
-    from_sticks, to_sticks = STICK_SETS[from_val], STICK_SETS[to_val]
-    sub = len(from_sticks - to_sticks)
-    add = len(to_sticks - from_sticks)
+    try:
+        return FROM_TO_CACHE[from_val][to_val]
+    except KeyError:
+        pass
 
-    return sub + add
+    # Sticks in exactly one of the two digits must be added or removed.
+    return bin(STICK_MASKS[from_val] ^ STICK_MASKS[to_val]).count("1")
 
 
 def populate_cache():
@@ -121,80 +119,210 @@ def populate_cache():
             FROM_TO_CACHE[from_val][to_val] = compute_moves(from_val, to_val)
 
 
-def generate_numbers(positions: int):
-    """
-    Generator function.
+populate_cache()
 
-    Generate all possible numbers in a list of form:
-        [0, 1, 2], where the number in a list is given by positions.
 
-    Return: One combination of numbers at a time until StopIteration reached.
+def build_enumerator(positions: int):
+    """
+    Generate a function specialized to enumerate candidates of exactly positions digits.
+    The loops over each digit are unrolled into nested loops so the cost and value
+    of each prefix is carried down without any generic per digit bookkeeping.
+
+    The generated function takes one list of 10 costs per position followed by the cutoff.
+    Returns: The generated function, it returns a list of (value, moves) in increasing value.
     """
     if positions < 1:
         raise ValueError("Won't generate numbers below 1 position.")
 
-    for val in range(0, 10 ** positions):
-        yield [int(n) for n in list(str(val).zfill(positions))]
-
-
+    args = ", ".join(f"c{ind}" for ind in range(0, positions))
+    lines = [
+        f"def enumerate_{positions}({args}, cutoff):",
+        "    out = []",
+        "    append = out.append",
+    ]
+    for ind in range(0, positions):
+        indent = "    " * (ind + 1)
+        prev_moves = f"m{ind - 1} + " if ind else ""
+        prev_value = f"v{ind - 1} * 10 + " if ind else ""
+        lines += [
+            f"{indent}for d{ind}, cost in enumerate(c{ind}):",
+            f"{indent}    m{ind} = {prev_moves}cost",
+            f"{indent}    if m{ind} > cutoff:",
+            f"{indent}        continue",
+            f"{indent}    v{ind} = {prev_value}d{ind}",
+        ]
+    lines += [
+        "    " * (positions + 1) + f"append((v{positions - 1}, m{positions - 1}))",
+        "    return out",
+    ]
+
+    namespace = {}
+    exec("\n".join(lines), namespace)  # pylint: disable=exec-used
+
+    return namespace[f"enumerate_{positions}"]
+
+
+# Specialized enumerators for every length of number up to MAX_VAL.
+ENUMERATORS = {positions: build_enumerator(positions) for positions in range(1, len(str(MAX_VAL)) + 1)}
+
+
+@functools.lru_cache(maxsize=256)
 def candidate_numbers(target_num: int, move_cutoff: int = DEFAULT_MOVE_CUTOFF):
     """
     Take a target number and find all the candidates with least moves to make a new number.
-    Returns a dictionary mapping the possible matches with least moves.
+    Results are cached, treat the returned candidates as read only.
+    Every value appears once, each has a single digit string as wide as target_num.
+
+    Returns: A tuple of candidates in increasing number of moves.
     """
-    candidates = []
-    target_list = [int(n) for n in list(str(target_num))]
-    positions = len(target_list)
+    target_digits = bytes(int(n) for n in str(target_num))
+    position_costs = [[compute_moves(from_val, to_val) for to_val in range(0, 10)] for from_val in target_digits]
 
-    for possible in generate_numbers(positions):
-        moves = 0
-        for from_val, to_val in zip(target_list, possible):
-            moves += compute_moves(from_val, to_val)
+    try:
+        layer = ENUMERATORS[len(target_digits)](*position_costs, move_cutoff)
+    except KeyError:
+        # Extend every surviving prefix by one digit per pass, summing the cost of
+        # that digit from the 10x10 table and dropping prefixes beyond the cutoff.
+        layer = [(0, 0)]
+        for costs in position_costs:
+            layer = [(prefix * 10 + to_val, moves + cost) for prefix, moves in layer
+                     for to_val, cost in enumerate(costs) if moves + cost <= move_cutoff]
 
-        # No reason to consider beyond the cutoff
-        if moves > move_cutoff:
-            continue
+    candidates = [ValueMove(value, moves) for value, moves in layer]
 
-        candidate_num = int("".join([str(x) for x in possible]))
-        candidates += [ValueMove(candidate_num, moves)]
+    return tuple(sorted(candidates, key=operator.attrgetter("moves")))
 
-    return sorted(candidates)
 
+def bucket_by_moves(candidates, move_cutoff: int):
+    """
+    Split candidates into buckets indexed by their moves.
+    Candidates beyond move_cutoff are dropped.
+    Each candidate is kept with its rank, the position it had in candidates.
 
-def find_lowest_sum(val1: int, val2: int, val_sum: int, *, total_cutoff: int = DEFAULT_MOVE_CUTOFF):
+    Returns: A list of lists, bucket i holds all (rank, candidate) taking i moves.
     """
-    Taking the values of formula:
-        a + b = c
+    buckets = [[] for _ in range(0, move_cutoff + 1)]
+    for rank, cand in enumerate(candidates):
+        if cand.moves <= move_cutoff:
+            buckets[cand.moves].append((rank, cand))
 
-    Attempt to find any combination that satisfies:
-        a + b = c
+    return buckets
 
-    Track all possible solutions and the number of moves required.
 
-    Returns: A list in order of solutions in increasing number of moves.
+def index_by_value(candidates):
+    """
+    Map each candidate value to the candidate reaching it in the least moves.
+
+    Returns: A dictionary of value -> ValueMove.
+    """
+    by_value = {}
+    for cand in candidates:
+        best = by_value.get(cand.value)
+        if best is None or cand.moves < best.moves:
+            by_value[cand.value] = cand
+
+    return by_value
+
+
+def format_answers(matches, symbol: str, limit: int = None):
+    """
+    Select the matches with least moves and only then format them for display.
+
+    matches: A list of tuples of form (moves, total_rank, first_rank, first, second, total).
+             Matches with equal moves keep the order of the total then first candidates.
+    symbol: The operator to display between first and second.
+    limit: If given, only keep this many answers.
+
+    Returns: A list of ValueMove with the formatted solution as the value, in increasing number of moves.
     """
-    first_candidates = candidate_numbers(val1, 4)
-    second_candidates = candidate_numbers(val2, 4)
-    sum_candidates = candidate_numbers(val_sum, 4)
+    if limit is None:
+        selected = sorted(matches, key=operator.itemgetter(0, 1, 2))
+    else:
+        selected = heapq.nsmallest(limit, matches, key=operator.itemgetter(0, 1, 2))
 
-    answers = []
-    for total in sum_candidates:
-        for first in first_candidates:
-            for second in second_candidates:
+    return [ValueMove(f"{first} {symbol} {second} = {total}, takes {moves} moves.", moves)
+            for moves, _, _, first, second, total in selected]
 
-                temp = first + second
-                if temp.value == total.value:
 
-                    temp.moves += total.moves
-                    if temp.moves > total_cutoff:
+def pair_candidates(first_candidates, second_candidates, sum_candidates, symbol: str, second_sign: int,
+                    extra_moves: int, *, total_cutoff: int = DEFAULT_MOVE_CUTOFF, limit: int = None):
+    """
+    Pair up already computed candidates for each term of:
+        a (symbol) b = c
+
+    symbol: The operator to display between first and second.
+    second_sign: The second term needed is second_sign * (c - a), 1 for a sum and -1 for a subtraction.
+    extra_moves: Moves spent on every solution regardless of the terms, like changing the operator.
+
+    Returns: A list in order of solutions in increasing number of moves, at most limit long if given.
+    """
+    move_budget = total_cutoff - extra_moves
+    sum_buckets = bucket_by_moves(sum_candidates, move_budget)
+    first_buckets = bucket_by_moves(first_candidates, move_budget)
+    second_by_value = index_by_value(second_candidates)
+
+    # Bind the hot lookups locally, the pairing loops below dominate the run time.
+    lookup = second_by_value.get
+    matches = []
+    append = matches.append
+    for total_moves in range(0, move_budget + 1):
+        for first_moves in range(0, move_budget - total_moves + 1):
+            second_budget = move_budget - total_moves - first_moves
+            for total_rank, total in sum_buckets[total_moves]:
+                for first_rank, first in first_buckets[first_moves]:
+                    second = lookup(second_sign * (total.value - first.value))
+                    if second is None or second.moves > second_budget:
                         continue
 
-                    answers += [ValueMove(f"{first} + {second} = {total}, takes {temp.moves} moves.", temp.moves)]
+                    append((first.moves + second.moves + total.moves + extra_moves, total_rank, first_rank,
+                            first, second, total))
 
-    return sorted(answers, key=lambda x: x.moves)
+    return format_answers(matches, symbol, limit)
 
 
-def find_lowest_sub(val1: int, val2: int, val_sum: int, *, total_cutoff: int = DEFAULT_MOVE_CUTOFF):
+def pair_sum(first_candidates, second_candidates, sum_candidates, *,
+             total_cutoff: int = DEFAULT_MOVE_CUTOFF, limit: int = None):
+    """
+    Pair up already computed candidates for each term of:
+        a + b = c
+
+    Returns: A list in order of solutions in increasing number of moves, at most limit long if given.
+    """
+    return pair_candidates(first_candidates, second_candidates, sum_candidates, "+", 1, 0,
+                           total_cutoff=total_cutoff, limit=limit)
+
+
+def pair_sub(first_candidates, second_candidates, sum_candidates, *,
+             total_cutoff: int = DEFAULT_MOVE_CUTOFF, limit: int = None):
+    """
+    Pair up already computed candidates for each term of:
+        a - b = c
+
+    N.B. 1 will be added to all moves due to swap from + -> -
+
+    Returns: A list in order of solutions in increasing number of moves, at most limit long if given.
+    """
+    return pair_candidates(first_candidates, second_candidates, sum_candidates, "-", -1, 1,
+                           total_cutoff=total_cutoff, limit=limit)
+
+
+def find_lowest_sum(val1: int, val2: int, val_sum: int, *, total_cutoff: int = DEFAULT_MOVE_CUTOFF, limit: int = None):
+    """
+    Taking the values of formula:
+        a + b = c
+
+    Attempt to find any combination that satisfies:
+        a + b = c
+
+    Track all possible solutions and the number of moves required.
+
+    Returns: A list in order of solutions in increasing number of moves, at most limit long if given.
+    """
+    return pair_sum(candidate_numbers(val1, TERM_MOVE_CUTOFF), candidate_numbers(val2, TERM_MOVE_CUTOFF),
+                    candidate_numbers(val_sum, TERM_MOVE_CUTOFF), total_cutoff=total_cutoff, limit=limit)
+
+
+def find_lowest_sub(val1: int, val2: int, val_sum: int, *, total_cutoff: int = DEFAULT_MOVE_CUTOFF, limit: int = None):
     """
     Taking the values of formula:
         a + b = c
@@ -205,35 +333,36 @@ def find_lowest_sub(val1: int, val2: int, val_sum: int, *, total_cutoff: int = D
     Track all possible solutions and the number of moves required.
     N.B. 1 will be added to all moves due to swap from + -> -
 
-    Returns: A list in order of solutions in increasing number of moves.
+    Returns: A list in order of solutions in increasing number of moves, at most limit long if given.
     """
-    first_candidates = candidate_numbers(val1, 4)
-    second_candidates = candidate_numbers(val2, 4)
-    sum_candidates = candidate_numbers(val_sum, 4)
+    return pair_sub(candidate_numbers(val1, TERM_MOVE_CUTOFF), candidate_numbers(val2, TERM_MOVE_CUTOFF),
+                    candidate_numbers(val_sum, TERM_MOVE_CUTOFF), total_cutoff=total_cutoff, limit=limit)
 
-    answers = []
-    for total in sum_candidates:
-        for first in first_candidates:
-            for second in second_candidates:
 
-                temp = first - second
-                if temp.value == total.value:
+def solve(val1: int, val2: int, val_sum: int, *, total_cutoff: int = DEFAULT_MOVE_CUTOFF, limit: int = None):
+    """
+    Taking the values of formula:
+        a + b = c
 
-                    temp.moves += total.moves + 1
-                    if temp.moves > total_cutoff:
-                        continue
+    Find the solutions as both a sum and a subtraction, computing the candidates
+    for each term only once.
 
-                    answers += [ValueMove(f"{first} - {second} = {total}, takes {temp.moves} moves.", temp.moves)]
+    Returns: A tuple of (sums, subtractions), as find_lowest_sum and find_lowest_sub would.
+    """
+    first_candidates = candidate_numbers(val1, TERM_MOVE_CUTOFF)
+    second_candidates = candidate_numbers(val2, TERM_MOVE_CUTOFF)
+    sum_candidates = candidate_numbers(val_sum, TERM_MOVE_CUTOFF)
 
-    return sorted(answers, key=lambda x: x.moves)
+    return (
+        pair_sum(first_candidates, second_candidates, sum_candidates, total_cutoff=total_cutoff, limit=limit),
+        pair_sub(first_candidates, second_candidates, sum_candidates, total_cutoff=total_cutoff, limit=limit),
+    )
 
 
 def main():
     """
     Main entry.
     """
-    populate_cache()
-
     total_cutoff = input("Please input the highest number of total moves allowed. An integer.\n\n")
     try:
         total_cutoff = int(total_cutoff)
@@ -243,7 +372,7 @@ def main():
         raise ValueError("Incorrect usage, try again. I couldn't parse your expression.") from exc
 
     user_expression = input("Write query in form of: x + y = z\n\nExample: 59 + 12 = 98\n\n")
-    match = re.match(r'(\d+)\s*[+]\s*(\d+)\s*[=]\s*(\d+)', user_expression)
+    match = EXPRESSION_RE.match(user_expression)
     if not match or len(match.groups()) != 3:
         raise ValueError("Incorrect usage, try again. I couldn't parse your expression.")
 
@@ -253,15 +382,14 @@ def main():
     if first > MAX_VAL or second > MAX_VAL or total > MAX_VAL:
         raise ValueError("Computing the sticks for these high values may be very expensive. Choose sane values or remove this check.")
 
-    print("Top 25 possible sums with move cost.")
-    print("=" * 40 + "\n")
-    for cand in find_lowest_sum(first, second, total, total_cutoff=total_cutoff)[:25]:
-        print(cand)
+    sums, subs = solve(first, second, total, total_cutoff=total_cutoff, limit=25)
 
-    print("Top 25 Possible subtractions with move cost.\n1 move is taken to change to subtraction.")
-    print("=" * 40 + "\n")
-    for cand in find_lowest_sub(first, second, total, total_cutoff=total_cutoff)[:25]:
-        print(cand)
+    # Build the whole report and write it at once rather than a line at a time.
+    lines = ["Top 25 possible sums with move cost.", "=" * 40 + "\n"]
+    lines += [str(cand) for cand in sums]
+    lines += ["Top 25 Possible subtractions with move cost.\n1 move is taken to change to subtraction.", "=" * 40 + "\n"]
+    lines += [str(cand) for cand in subs]
+    sys.stdout.write("\n".join(lines) + "\n")
 
 
 if __name__ == "__main__":
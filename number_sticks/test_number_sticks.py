@@ -8,9 +8,9 @@ import number_sticks
 
 @pytest.fixture(autouse=True, scope="session")
 def before_tests():
-    assert number_sticks.FROM_TO_CACHE == {}
+    # Cache is populated on import.
+    assert number_sticks.FROM_TO_CACHE[4][5] == 3
 
-    number_sticks.populate_cache()
     yield True
 
     number_sticks.FROM_TO_CACHE = {}
@@ -22,6 +22,16 @@ def test_compute_moves():
     assert number_sticks.compute_moves(4, 5) == 3
 
 
+def test_compute_moves_uncached():
+    number_sticks.FROM_TO_CACHE = {}
+    try:
+        for from_val, from_sticks in number_sticks.STICK_SETS.items():
+            for to_val, to_sticks in number_sticks.STICK_SETS.items():
+                assert number_sticks.compute_moves(from_val, to_val) == len(from_sticks ^ to_sticks)
+    finally:
+        number_sticks.populate_cache()
+
+
 def test_populate_cache():
     """ """
     number_sticks.FROM_TO_CACHE = {}
@@ -31,12 +41,11 @@ def test_populate_cache():
     assert number_sticks.FROM_TO_CACHE[4][5] == 3
 
 
-def test_generate_numbers():
-    gen = number_sticks.generate_numbers(3)
+def test_build_enumerator():
+    costs = [[0, 1, 2] + [9] * 7, [1, 0] + [9] * 8]
+    enumerate_2 = number_sticks.build_enumerator(2)
 
-    assert next(gen) == [0, 0, 0]
-    assert next(gen) == [0, 0, 1]
-    assert next(gen) == [0, 0, 2]
+    assert enumerate_2(*costs, 2) == [(0, 1), (1, 0), (10, 2), (11, 1), (21, 2)]
 
 
 def test_candidate_numbers():
@@ -44,6 +53,49 @@ def test_candidate_numbers():
 
     assert [x.value for x in cands[:4]] == [55, 56, 59, 65]
     assert cands[3].moves == 1
+    assert number_sticks.candidate_numbers(55, 3) is cands
+    assert len({x.value for x in cands}) == len(cands)
+
+    # Updating a returned candidate must not change the cached one.
+    cand = cands[0]
+    cand += number_sticks.ValueMove(1, 1)
+    cand -= number_sticks.ValueMove(1, 1)
+    assert (cands[0].value, cands[0].moves) == (55, 0)
+    assert cand is not cands[0]
+
+    # Longer than any specialized enumerator
+    big = number_sticks.candidate_numbers(888888, 1)
+    assert len(big) == 19
+    assert [x.value for x in big[:4]] == [888888, 88888, 688888, 808888]
+
+
+def test_bucket_by_moves():
+    cands = number_sticks.candidate_numbers(55, 3)
+    buckets = number_sticks.bucket_by_moves(cands, 1)
+
+    assert len(buckets) == 2
+    assert [(rank, x.value) for rank, x in buckets[0]] == [(0, 55)]
+    assert [(rank, x.value) for rank, x in buckets[1][:3]] == [(1, 56), (2, 59), (3, 65)]
+
+
+def test_index_by_value():
+    cands = [number_sticks.ValueMove(55, 2), number_sticks.ValueMove(55, 1), number_sticks.ValueMove(56, 3)]
+    by_value = number_sticks.index_by_value(cands)
+
+    assert sorted(by_value) == [55, 56]
+    assert by_value[55].moves == 1
+
+
+def test_format_answers():
+    first, second, total = [number_sticks.ValueMove(x, 1) for x in (1, 2, 3)]
+    other = number_sticks.ValueMove(0, 1)
+    matches = [(5, 0, 0, first, second, total), (3, 1, 0, first, second, total),
+               (3, 0, 1, other, second, total), (4, 0, 0, first, second, total)]
+
+    answers = number_sticks.format_answers(matches, "+", 2)
+    assert [x.moves for x in answers] == [3, 3]
+    assert answers[0].value == '0(1) + 2(1) = 3(1), takes 3 moves.'
+    assert answers[1].value == '1(1) + 2(1) = 3(1), takes 3 moves.'
 
 
 def test_find_lowest_sum():
@@ -52,6 +104,14 @@ def test_find_lowest_sum():
     answers = [x.value for x in vals if x.moves == 4]
     assert '86(4) + 12(0) = 98(0), takes 4 moves.' in answers
     assert vals[0].moves == 4
+    assert [x.value for x in number_sticks.find_lowest_sum(59, 12, 98, limit=3)] == [x.value for x in vals[:3]]
+
+    # Ties keep the order of the sum candidates, then the first candidates.
+    top = [x.value for x in number_sticks.find_lowest_sum(59, 12, 98, limit=25)]
+    assert top[:3] == ['86(4) + 12(0) = 98(0), takes 4 moves.', '56(2) + 12(0) = 68(2), takes 4 moves.',
+                       '68(2) + 12(0) = 80(2), takes 4 moves.']
+    assert '36(4) + 12(0) = 48(2), takes 6 moves.' in top
+    assert '53(1) + 13(2) = 66(3), takes 6 moves.' in top
 
 
 def test_find_lowest_sub():
@@ -60,3 +120,11 @@ def test_find_lowest_sub():
     answers = [x.value for x in vals if x.moves == 4]
     assert '50(2) - 12(0) = 38(1), takes 4 moves.' in answers
     assert vals[0].moves == 4
+
+
+def test_solve():
+    sums, subs = number_sticks.solve(59, 12, 98)
+
+    assert [x.value for x in sums] == [x.value for x in number_sticks.find_lowest_sum(59, 12, 98)]
+    assert [x.value for x in subs] == [x.value for x in number_sticks.find_lowest_sub(59, 12, 98)]
+